@@ -1,199 +1,447 @@
-import json
+import orjson
 import os
+import shutil
 import tempfile
+import time
 import ast
+import io
+import tokenize
 import asyncio
 import re
 import aiohttp
 import warnings
 import tarfile
+import urllib.parse
 import zipfile
 import logging
-from typing import List, Dict, Any
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Iterator, List, Dict, Any, Tuple
 from rich.progress import Progress, TaskID
 from rich.console import Console
 
-FILE_LOCK = asyncio.Lock()
+WRITE_BATCH_SIZE = 32
+PARSE_BATCH_SIZE = 64
+PROGRESS_INTERVAL = 0.1
+# Don't let a stalled download or clone hold a concurrency slot forever. Use sock_connect rather
+# than connect: the latter also counts time spent queuing for a free pooled connection.
+HTTP_TIMEOUT = aiohttp.ClientTimeout(total=120, sock_connect=10, sock_read=30)
+# Archives are extracted while they stream in, so large ones can legitimately take a long time
+ARCHIVE_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=30)
+GIT_TIMEOUT = 120
+MAX_RETRIES = 3
+# Also matches one-line `if x: assert y` and `a; assert b` forms, unlike an anchored pattern
+ASSERT_KEYWORD_RE = re.compile(rb'\bassert\b')
+GITHUB_URL_RE = re.compile(r'(https?://github\.com/[^/]+/[^/]+)')
+# project_urls keys (lowercased) that may point at the repository, in order of preference
+SOURCE_URL_KEYS = {key: rank for rank, key in enumerate(['source', 'code', 'repository', 'github: repo', 'source code', 'homepage', 'github'])}
+ISSUE_URL_KEYS = {key: rank for rank, key in enumerate(['issues', 'bug tracker', 'bug reports'])}
+
+async def get_with_retries(session: aiohttp.ClientSession, url: str,
+                           timeout: aiohttp.ClientTimeout = HTTP_TIMEOUT) -> aiohttp.ClientResponse:
+    for attempt in range(MAX_RETRIES):
+        try:
+            return await session.get(url, timeout=timeout)
+        except (TimeoutError, aiohttp.ClientError):
+            if attempt == MAX_RETRIES - 1:
+                raise
+            await asyncio.sleep(2 ** attempt)
 
 async def read_json_file(file_path: str) -> Dict[str, Any]:
-    with open(file_path, 'r') as f:
-        return json.load(f)
+    with open(file_path, 'rb') as f:
+        return orjson.loads(f.read())
 
-async def get_github_url(session: aiohttp.ClientSession, package_name: str) -> str:
+async def fetch_pypi_metadata(session: aiohttp.ClientSession, package_name: str) -> Dict[str, Any]:
     pypi_url = f"https://pypi.org/pypi/{package_name}/json"
-    async with session.get(pypi_url) as response:
+    async with await get_with_retries(session, pypi_url) as response:
         if response.status == 200:
-            data = await response.json()
-            project_urls = data.get('info', {}).get('project_urls', {})
-
-            # Try to find GitHub URL from project_urls by matching against a url regexp
-            regexp = re.compile(r'(https?://github\.com/[^/]+/[^/]+)')
-            for value in project_urls.values():
-                match = regexp.match(value)
-                if match:
-                    return match.group(1)
-
-            # Try to find GitHub URL from project_urls by checking for common keys
-            for possible_key in ['Source', 'Code', 'Repository', "GitHub: repo", "Source Code", "Homepage", "GitHub"]:
-                url = project_urls.get(possible_key) or project_urls.get(possible_key.lower())
-                if url and 'github.com' in url:
-                    return url
-            for possible_issue_key in ['Issues', 'Bug Tracker', 'Bug Reports']:
-                issue_url = project_urls.get(possible_issue_key) or project_urls.get(possible_issue_key.lower())
-                if issue_url and 'github.com' in issue_url:
-                    return issue_url.replace('/issues', '')
-    return ''
+            return orjson.loads(await response.read())
+    return {}
 
+def extract_github_url(data: Dict[str, Any]) -> str:
+    project_urls = data.get('info', {}).get('project_urls') or {}
 
-async def get_sdist_url(session: aiohttp.ClientSession, package_name: str) -> str:
-    pypi_url = f"https://pypi.org/pypi/{package_name}/json"
-    async with session.get(pypi_url) as response:
-        if response.status == 200:
-            data = await response.json()
-            releases = data.get('releases', {})
-            latest_version = data['info']['version']
-            for url_info in releases.get(latest_version, []):
-                if url_info['packagetype'] == 'sdist':
-                    return url_info['url']
+    # Single pass over project_urls: a value matching GITHUB_URL_RE wins outright, otherwise
+    # use the best ranked source key, and finally the best ranked issue tracker key
+    source_url, source_rank = '', len(SOURCE_URL_KEYS)
+    issue_url, issue_rank = '', len(ISSUE_URL_KEYS)
+    for key, value in project_urls.items():
+        if not isinstance(value, str) or 'github.com' not in value:
+            continue
+        match = GITHUB_URL_RE.match(value)
+        if match:
+            return match.group(1)
+        key = key.lower()
+        rank = SOURCE_URL_KEYS.get(key, source_rank)
+        if rank < source_rank:
+            source_url, source_rank = value, rank
+        rank = ISSUE_URL_KEYS.get(key, issue_rank)
+        if rank < issue_rank:
+            issue_url, issue_rank = value, rank
+    if source_url:
+        return source_url
+    return issue_url.replace('/issues', '')
+
+def extract_sdist_url(data: Dict[str, Any]) -> str:
+    if not data:
+        return ''
+    releases = data.get('releases', {})
+    latest_version = data['info']['version']
+    for url_info in releases.get(latest_version, []):
+        if url_info['packagetype'] == 'sdist':
+            return url_info['url']
     return ''
 
+DOWNLOAD_CHUNK_SIZE = 1 << 16
+
+class ResponseReader(io.RawIOBase):
+    """Blocking file-like view of an aiohttp response body, to be read from a worker thread."""
+
+    def __init__(self, response: aiohttp.ClientResponse, loop: asyncio.AbstractEventLoop):
+        self.response = response
+        self.loop = loop
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = asyncio.run_coroutine_threadsafe(self.response.content.read(len(buffer)), self.loop).result()
+        buffer[:len(data)] = data
+        return len(data)
+
+def skip_unsafe_members(member: tarfile.TarInfo, dest_path: str) -> tarfile.TarInfo | None:
+    # Apply the 'data' filter so untrusted archives can't write outside extracted_dir, but skip the
+    # members it rejects (e.g. stray symlinks) instead of aborting the whole extraction. Returning
+    # None is used rather than errorlevel 0, which on older patch releases extracts rejected members.
+    try:
+        return tarfile.data_filter(member, dest_path)
+    except tarfile.FilterError:
+        return None
+
+def extract_archive(fileobj, file_name: str, extracted_dir: str) -> None:
+    os.makedirs(extracted_dir, exist_ok=True)
+    if file_name.endswith('.tar.gz') or file_name.endswith('.tgz'):
+        with tarfile.open(fileobj=fileobj, mode='r|gz') as tar:
+            tar.extractall(path=extracted_dir, filter=skip_unsafe_members)
+    elif file_name.endswith('.zip'):
+        with zipfile.ZipFile(fileobj, 'r') as zip_ref:
+            zip_ref.extractall(extracted_dir)
+    else:
+        raise ValueError(f"Unsupported file format: {file_name}")
+
+async def extract_response(response: aiohttp.ClientResponse, file_name: str, extracted_dir: str) -> None:
+    if file_name.endswith('.zip'):
+        # Zip files need random access, so spool them to disk first
+        with tempfile.TemporaryFile(dir=os.path.dirname(extracted_dir)) as f:
+            async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+            f.seek(0)
+            await asyncio.to_thread(extract_archive, f, file_name, extracted_dir)
+    else:
+        stream = io.BufferedReader(ResponseReader(response, asyncio.get_running_loop()), DOWNLOAD_CHUNK_SIZE)
+        await asyncio.to_thread(extract_archive, stream, file_name, extracted_dir)
+
 async def download_and_extract_sdist(session: aiohttp.ClientSession, sdist_url: str, temp_dir: str) -> str:
-    async with session.get(sdist_url) as response:
+    async with await get_with_retries(session, sdist_url, timeout=ARCHIVE_TIMEOUT) as response:
         if response.status == 200:
-            content = await response.read()
-            file_name = os.path.basename(sdist_url)
-            file_path = os.path.join(temp_dir, file_name)
-            with open(file_path, 'wb') as f:
-                f.write(content)
-            
             extracted_dir = os.path.join(temp_dir, 'extracted')
-            os.makedirs(extracted_dir, exist_ok=True)
-            
-            if file_name.endswith('.tar.gz') or file_name.endswith('.tgz'):
-                with tarfile.open(file_path, 'r:gz') as tar:
-                    with warnings.catch_warnings():
-                        warnings.simplefilter("ignore")
-                        tar.extractall(path=extracted_dir)
-            elif file_name.endswith('.zip'):
-                with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                    zip_ref.extractall(extracted_dir)
-            else:
-                raise ValueError(f"Unsupported file format: {file_name}")
-            
+            await extract_response(response, os.path.basename(sdist_url), extracted_dir)
             return extracted_dir
     raise ValueError(f"Failed to download sdist from {sdist_url}")
 
-async def clone_repo(github_url: str, temp_dir: str) -> str:
-    repo_dir = os.path.join(temp_dir, github_url.split('/')[-1])
+async def download_github_tarball(session: aiohttp.ClientSession, github_url: str, temp_dir: str) -> str:
+    owner, repo = urllib.parse.urlparse(github_url).path.strip('/').split('/')[:2]
+    repo = repo.removesuffix('.git')
+    tarball_url = f"https://codeload.github.com/{owner}/{repo}/tar.gz/HEAD"
+    async with await get_with_retries(session, tarball_url, timeout=ARCHIVE_TIMEOUT) as response:
+        if response.status == 404:
+            return ''
+        if response.status == 200:
+            extracted_dir = os.path.join(temp_dir, f"{owner}-{repo}")
+            await extract_response(response, f"{repo}.tar.gz", extracted_dir)
+            return extracted_dir
+    raise ValueError(f"Failed to download tarball from {tarball_url}")
+
+GIT_ENV = {**os.environ, 'GIT_TERMINAL_PROMPT': '0'}
+
+async def run_git(*args: str) -> None:
     process = await asyncio.create_subprocess_exec(
-        'git', 'clone', '--depth', '1', github_url, repo_dir,
+        'git', *args,
         stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE
+        stderr=asyncio.subprocess.PIPE,
+        env=GIT_ENV,
+    )
+    try:
+        _, stderr = await asyncio.wait_for(process.communicate(), timeout=GIT_TIMEOUT)
+    except TimeoutError:
+        process.kill()
+        await process.wait()
+        raise
+    if process.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed: {stderr.decode(errors='replace').strip()}")
+
+async def clone_repo(github_url: str, temp_dir: str) -> str:
+    repo_dir = os.path.join(temp_dir, github_url.split('/')[-1])
+    # Blobless sparse clone: only the blobs of the .py files we actually read get fetched
+    await run_git(
+        'clone', '--depth=1', '--single-branch', '--no-tags',
+        '--filter=blob:none', '--sparse', github_url, repo_dir,
     )
-    await process.communicate()
+    await run_git('-C', repo_dir, 'sparse-checkout', 'set', '--no-cone', '*.py')
     return repo_dir
 
 class AssertFinder(ast.NodeVisitor):
-    def __init__(self):
+    def __init__(self, source: str):
+        self.source = source
+        self._lines = None
         self.asserts = []
 
+    @property
+    def lines(self) -> List[bytes]:
+        # AST column offsets are in UTF-8 bytes, so slice the encoded lines
+        if self._lines is None:
+            self._lines = self.source.encode().splitlines(keepends=True)
+        return self._lines
+
+    def visit(self, node):
+        # ast.walk skips NodeVisitor's getattr-based dispatch on every non-Assert node
+        for child in ast.walk(node):
+            if type(child) is ast.Assert:
+                self.visit_Assert(child)
+
     def visit_Assert(self, node):
-        self.asserts.append(ast.unparse(node).strip())
+        lines = self.lines[node.lineno - 1:node.end_lineno]
+        if len(lines) == 1:
+            text = lines[0][node.col_offset:node.end_col_offset]
+        else:
+            text = lines[0][node.col_offset:] + b''.join(lines[1:-1]) + lines[-1][:node.end_col_offset]
+        self.asserts.append(text.decode().strip())
+
+def scan_asserts(source: str) -> List[str]:
+    # `assert` is a hard keyword, so every NAME token spelling it starts an assert statement
+    # that runs until the end of the logical line (or a `;`).
+    # Split lines exactly like tokenize does; str.splitlines also breaks on \x0c, \u2028 and friends.
+    # newline=None translates \r and \r\n like text mode, so CR-only files aren't read as one line.
+    lines = io.StringIO(source, newline=None).readlines()
+    asserts = []
+    start = end = None
+    for token in tokenize.generate_tokens(io.StringIO(source, newline=None).readline):
+        if start is None:
+            if token.type == tokenize.NAME and token.string == 'assert':
+                start, end = token.start, token.end
+        elif token.type == tokenize.NEWLINE or token.type == tokenize.ENDMARKER or token.exact_type == tokenize.SEMI:
+            (start_row, start_col), (end_row, end_col) = start, end
+            if start_row == end_row:
+                text = lines[start_row - 1][start_col:end_col]
+            else:
+                text = lines[start_row - 1][start_col:] + ''.join(lines[start_row:end_row - 1]) + lines[end_row - 1][:end_col]
+            asserts.append(text.strip())
+            start = end = None
+        elif token.type not in (tokenize.COMMENT, tokenize.NL):
+            end = token.end
+    return asserts
 
-def count_py_files(repo_dir: str) -> int:
-    return sum(1 for root, _, files in os.walk(repo_dir) for file in files if file.endswith('.py'))
+def iter_py_files(root: str) -> Iterator[str]:
+    # Like os.walk, but without building the per-directory name lists
+    try:
+        entries = os.scandir(root)
+    except OSError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_py_files(entry.path)
+            elif entry.name.endswith('.py'):
+                yield entry.path
 
-async def find_asserts(repo_dir: str, progress: Progress, task_id: TaskID) -> List[str]:
-    assert_finder = AssertFinder()
-    for root, _, files in os.walk(repo_dir):
-        for file in files:
-            if file.endswith('.py'):
-                file_path = os.path.join(root, file)
-                try:
-                    with open(file_path, 'r') as f:
-                        with warnings.catch_warnings():
-                            warnings.simplefilter("ignore")
-                            tree = ast.parse(f.read())
-                            assert_finder.visit(tree)
-                except SyntaxError:
-                    print(f"Syntax error in file: {file_path}")
-                progress.update(task_id, advance=1)
-                await asyncio.sleep(0)
-    return assert_finder.asserts
+def _parse_file(file_path: str) -> Tuple[List[str], List[str]]:
+    # Runs in a worker process: diagnostics are returned to the parent rather than printed here
+    try:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        return [], [f"Could not read file: {file_path}: {e.strerror}"]
+    # Most files have no asserts at all; a C-level regex scan is far cheaper than tokenizing them
+    if not ASSERT_KEYWORD_RE.search(data):
+        return [], []
+    try:
+        # Honour PEP 263 coding cookies instead of the locale encoding
+        encoding, _ = tokenize.detect_encoding(io.BytesIO(data).readline)
+        source = data.decode(encoding)
+    except (SyntaxError, UnicodeDecodeError):
+        return [], [f"Could not decode file: {file_path}"]
+    try:
+        return scan_asserts(source), []
+    except (tokenize.TokenError, SyntaxError):
+        pass
+    assert_finder = AssertFinder(source)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            tree = compile(data, file_path, 'exec', flags=ast.PyCF_ONLY_AST, dont_inherit=True)
+            assert_finder.visit(tree)
+    except SyntaxError:
+        return [], [f"Syntax error in file: {file_path}"]
+    return assert_finder.asserts, []
+
+def _parse_files(file_paths: List[str]) -> Tuple[List[str], List[str]]:
+    asserts = {}
+    diagnostics = []
+    for file_path in file_paths:
+        file_asserts, file_diagnostics = _parse_file(file_path)
+        # Deduplicate (keeping order) before the results are sent back from the worker
+        asserts.update(dict.fromkeys(file_asserts))
+        diagnostics.extend(file_diagnostics)
+    return list(asserts), diagnostics
+
+async def find_asserts(repo_dir: str, parse_pool: ProcessPoolExecutor, progress: Progress, task_id: TaskID) -> AsyncIterator[str]:
+    file_paths = list(iter_py_files(repo_dir))
+    progress.update(task_id, total=len(file_paths))
+    batches = [file_paths[i:i + PARSE_BATCH_SIZE] for i in range(0, len(file_paths), PARSE_BATCH_SIZE)]
+    loop = asyncio.get_running_loop()
+
+    async def parse_batch(batch: List[str]) -> Tuple[int, Tuple[List[str], List[str]]]:
+        return len(batch), await loop.run_in_executor(parse_pool, _parse_files, batch)
+
+    tasks = [asyncio.ensure_future(parse_batch(batch)) for batch in batches]
+    parsed_files = 0
+    last_tick = time.monotonic()
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            batch_size, (asserts, diagnostics) = await next_done
+            for diagnostic in diagnostics:
+                print(diagnostic)
+            for assertion in asserts:
+                yield assertion
+            parsed_files += batch_size
+            # Rendering the progress bar takes a lock, so only refresh it every PROGRESS_INTERVAL seconds
+            now = time.monotonic()
+            if now - last_tick > PROGRESS_INTERVAL:
+                progress.update(task_id, completed=parsed_files)
+                last_tick = now
+    finally:
+        for task in tasks:
+            task.cancel()
+    progress.update(task_id, completed=parsed_files)
 
 async def process_package(session: aiohttp.ClientSession, package_name: str, temp_dir: str, progress: Progress, overall_task: TaskID, semaphore: asyncio.Semaphore,
-                          results_file) -> None:
+                          parse_pool: ProcessPoolExecutor, pypi_semaphore: asyncio.Semaphore, results_queue: asyncio.Queue) -> None:
     async with semaphore:
+        # Work in a per-package directory so it can be removed as soon as the package is done
+        package_dir = tempfile.mkdtemp(dir=temp_dir)
         try:
-            github_url = await get_github_url(session, package_name)
-        except Exception as e:
-            print(f"Error getting GitHub URL for {package_name}: {str(e)}")
-            progress.update(overall_task, advance=1)
-            return
-        if not github_url:
-            print(f"No GitHub URL found for {package_name}, trying sdist...")
-            sdist_url = await get_sdist_url(session, package_name)
-            if not sdist_url:
-                print(f"No sdist URL found for {package_name}")
-                progress.update(overall_task, advance=1)
-                return 
             try:
-                repo_dir = await download_and_extract_sdist(session, sdist_url, temp_dir)
+                async with pypi_semaphore:
+                    metadata = await fetch_pypi_metadata(session, package_name)
+                github_url = extract_github_url(metadata)
             except Exception as e:
-                print(f"Error downloading or extracting sdist for {package_name}: {str(e)}")
+                print(f"Error getting GitHub URL for {package_name}: {str(e)}")
                 progress.update(overall_task, advance=1)
-                return 
-        else:
+                return
+            if not github_url:
+                print(f"No GitHub URL found for {package_name}, trying sdist...")
+                try:
+                    sdist_url = extract_sdist_url(metadata)
+                except Exception as e:
+                    print(f"Error getting sdist URL for {package_name}: {str(e)}")
+                    progress.update(overall_task, advance=1)
+                    return
+                if not sdist_url:
+                    print(f"No sdist URL found for {package_name}")
+                    progress.update(overall_task, advance=1)
+                    return 
+                try:
+                    repo_dir = await download_and_extract_sdist(session, sdist_url, package_dir)
+                except Exception as e:
+                    print(f"Error downloading or extracting sdist for {package_name}: {str(e)}")
+                    progress.update(overall_task, advance=1)
+                    return 
+            else:
+                try:
+                    repo_dir = await download_github_tarball(session, github_url, package_dir)
+                    if not repo_dir:
+                        repo_dir = await clone_repo(github_url, package_dir)
+                except Exception as e:
+                    print(f"Error fetching repo for {package_name}: {str(e)}")
+                    progress.update(overall_task, advance=1)
+                    return 
+
+            package_task = None
             try:
-                repo_dir = await clone_repo(github_url, temp_dir)
+                package_task = progress.add_task(f"[cyan]Processing {package_name}", total=None)
+                seen = set()
+                async for assertion in find_asserts(repo_dir, parse_pool, progress, package_task):
+                    if assertion in seen:
+                        continue
+                    seen.add(assertion)
+                    await results_queue.put(orjson.dumps({"p": package_name, "a": assertion}) + b'\n')
+                progress.update(overall_task, advance=1)
+                progress.remove_task(package_task)
+                return
             except Exception as e:
-                print(f"Error cloning repo for {package_name}: {str(e)}")
+                print(f"Error processing {package_name}: {str(e)}")
+                # Rows are streamed as they are found, so mark the package as failed and let
+                # consumers drop whatever partial rows it already produced
+                await results_queue.put(orjson.dumps({"p": package_name, "error": str(e)}) + b'\n')
                 progress.update(overall_task, advance=1)
-                return 
+                if package_task:
+                    progress.remove_task(package_task)
+                return
+        finally:
+            await asyncio.to_thread(shutil.rmtree, package_dir, ignore_errors=True)
 
-        package_task = None
-        try:
-            repo_dir = await clone_repo(github_url, temp_dir)
-            py_file_count = count_py_files(repo_dir)
-            package_task = progress.add_task(f"[cyan]Processing {package_name}", total=py_file_count)
-            asserts = await find_asserts(repo_dir, progress, package_task)
-            progress.update(overall_task, advance=1)
-            progress.remove_task(package_task)
-            result = {package_name: asserts}
-            async with FILE_LOCK:
-                results_file.write(json.dumps(result) + '\n')
-                results_file.flush()
-            return
-        except Exception as e:
-            print(f"Error processing {package_name}: {str(e)}")
-            progress.update(overall_task, advance=1)
-            if package_task:
-                progress.remove_task(package_task)
-            return
+async def write_results(results_queue: asyncio.Queue, results_file) -> None:
+    # Single writer: drain whatever results are queued (up to WRITE_BATCH_SIZE) and write them at once,
+    # leaving it to the file's buffer to coalesce them into large writes.
+    # A None item signals that no more results are coming.
+    done = False
+    while not done:
+        batch = [await results_queue.get()]
+        while len(batch) < WRITE_BATCH_SIZE and not results_queue.empty():
+            batch.append(results_queue.get_nowait())
+        if None in batch:
+            done = True
+            batch = [line for line in batch if line is not None]
+        results_file.writelines(batch)
+    results_file.flush()
 
 async def main():
     json_file = 'top-pypi-packages/top-pypi-packages-30-days.json'
     data = await read_json_file(json_file)
     
-    max_concurrent = 100
+    max_concurrent = 200
     semaphore = asyncio.Semaphore(max_concurrent)
+    # Separate limit for metadata calls so they don't queue behind large downloads
+    pypi_semaphore = asyncio.Semaphore(50)
 
     console = Console()
     all_packages = data['rows']
-    with Progress(console=console) as progress:
+    # ast.parse is CPU bound, so keep it off the event loop thread. Don't fork the workers: by the
+    # time they start, rich's refresh thread and the extraction threads are already running.
+    with (
+        ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=multiprocessing.get_context('forkserver')) as parse_pool,
+        Progress(console=console) as progress,
+    ):
         overall_task = progress.add_task("[green]Processing packages", total=len(all_packages))
         
 
         with (
             tempfile.TemporaryDirectory() as temp_dir,
-            open('results.json', 'w') as results_file,
+            open('results.json', 'wb', buffering=1 << 20) as results_file,
         ):
+            results_queue = asyncio.Queue()
+            writer = asyncio.create_task(write_results(results_queue, results_file))
             async with (
-                aiohttp.ClientSession() as session,
+                aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(limit=200, limit_per_host=32, ttl_dns_cache=600, enable_cleanup_closed=True),
+                    timeout=HTTP_TIMEOUT,
+                ) as session,
                 asyncio.TaskGroup() as tg,
             ):
                 for package in all_packages:
-                    tg.create_task(process_package(session, package['project'], temp_dir, progress, overall_task, semaphore, results_file))
+                    tg.create_task(process_package(session, package['project'], temp_dir, progress, overall_task, semaphore, parse_pool, pypi_semaphore, results_queue))
+            await results_queue.put(None)
+            await writer
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
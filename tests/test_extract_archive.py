@@ -0,0 +1,34 @@
+import io
+import os
+import tarfile
+
+from find_asserts import extract_archive
+
+
+def make_tarball(members):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as tar:
+        for info, data in members:
+            tar.addfile(info, io.BytesIO(data) if data is not None else None)
+    buffer.seek(0)
+    return buffer
+
+
+def test_extracts_tarball(tmp_path):
+    source = b"assert x\n"
+    info = tarfile.TarInfo('pkg/a.py')
+    info.size = len(source)
+    extract_archive(make_tarball([(info, source)]), 'pkg.tar.gz', str(tmp_path / 'out'))
+    assert (tmp_path / 'out' / 'pkg' / 'a.py').read_bytes() == source
+
+
+def test_skips_symlink_outside_destination(tmp_path):
+    source = b"assert x\n"
+    info = tarfile.TarInfo('pkg/a.py')
+    info.size = len(source)
+    link = tarfile.TarInfo('pkg/rel')
+    link.type = tarfile.SYMTYPE
+    link.linkname = '../../../outside'
+    extract_archive(make_tarball([(info, source), (link, None)]), 'pkg.tar.gz', str(tmp_path / 'out'))
+    assert (tmp_path / 'out' / 'pkg' / 'a.py').read_bytes() == source
+    assert not os.path.lexists(tmp_path / 'out' / 'pkg' / 'rel')
@@ -0,0 +1,51 @@
+from find_asserts import scan_asserts
+
+
+def test_simple_assert():
+    assert scan_asserts("assert x == 1, 'msg'\n") == ["assert x == 1, 'msg'"]
+
+
+def test_no_asserts():
+    assert scan_asserts("x = 1\nself.assertEqual(x, 1)\n") == []
+
+
+def test_trailing_comment_is_dropped():
+    assert scan_asserts("assert x  # comment\n") == ["assert x"]
+
+
+def test_semicolon_separated_statements():
+    assert scan_asserts("assert a; assert b\n") == ["assert a", "assert b"]
+
+
+def test_one_line_compound_statement():
+    assert scan_asserts("if x: assert y\n") == ["assert y"]
+
+
+def test_multi_line_assert_in_brackets():
+    source = "def f():\n    assert g(\n        1,\n    )  # comment\n"
+    assert scan_asserts(source) == ["assert g(\n        1,\n    )"]
+
+
+def test_backslash_continuation():
+    assert scan_asserts("assert x == \\\n    1\n") == ["assert x == \\\n    1"]
+
+
+def test_missing_trailing_newline():
+    assert scan_asserts("assert x") == ["assert x"]
+
+
+def test_form_feed_does_not_shift_lines():
+    assert scan_asserts("x = 1\n\x0c\nassert x == 1, 'msg'\n") == ["assert x == 1, 'msg'"]
+
+
+def test_unicode_line_separator_does_not_shift_lines():
+    source = 'doc = "a\u2028b"\nassert first == 1\n'
+    assert scan_asserts(source) == ["assert first == 1"]
+
+
+def test_cr_only_line_endings():
+    assert scan_asserts("x = 1\rassert x == 1\rassert y\r") == ["assert x == 1", "assert y"]
+
+
+def test_crlf_line_endings():
+    assert scan_asserts("x = 1\r\nassert (x,\r\n    1)\r\n") == ["assert (x,\n    1)"]